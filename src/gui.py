@@ -36,6 +36,7 @@ class SteganographyApp:
         self.random_start_var = tk.IntVar(value=1)
         self.encrypt_var = tk.IntVar(value=1)
         self.lsb_var = tk.StringVar(value="2")
+        self.adaptive_var = tk.IntVar(value=0)
         self.stego_key_var = tk.StringVar()
 
     def _create_widgets(self):
@@ -100,6 +101,11 @@ class SteganographyApp:
         for i in range(1, 5):
             ttk.Radiobutton(lsb_radios, text=f"{i}-bit", variable=self.lsb_var, value=str(i)).pack(side=tk.LEFT, padx=5)
         lsb_radios.grid(row=2, column=1, sticky='w')
+        ttk.Label(self.options_frame, text="Adaptive n-LSB:").grid(row=3, column=0, sticky='w', padx=5, pady=5)
+        adaptive_radios = ttk.Frame(self.options_frame)
+        ttk.Radiobutton(adaptive_radios, text="Enable", variable=self.adaptive_var, value=1).pack(side=tk.LEFT, padx=5)
+        ttk.Radiobutton(adaptive_radios, text="Disable", variable=self.adaptive_var, value=0).pack(side=tk.LEFT, padx=5)
+        adaptive_radios.grid(row=3, column=1, sticky='w')
         
         self.key_frame = ttk.LabelFrame(self.scrollable_frame, text="Stego Key", padding="10")
         self.key_frame.pack(fill=tk.X, expand=True, pady=10)
@@ -138,7 +144,7 @@ class SteganographyApp:
             self.main_canvas.configure(scrollregion=(0, 0, canvas_width, frame_height))
         self.main_canvas.coords(self.canvas_window, 0, new_y)
 
-    def _execute_embed(self, audio_file, stego_key, n_lsb, use_encryption, use_random_start):
+    def _execute_embed(self, audio_file, stego_key, n_lsb, use_encryption, use_random_start, use_adaptive):
         secret_data = None
         secret_filename = ""
         if self.plaintext_source_var.get() == 'text_mode':
@@ -169,7 +175,7 @@ class SteganographyApp:
         result = embed_message(
             cover_audio_path=audio_file, secret_data=secret_data, secret_filename=secret_filename,
             stego_key=stego_key, n_lsb=n_lsb, use_encryption=use_encryption, 
-            use_random_start=use_random_start, output_path=output_path
+            use_random_start=use_random_start, output_path=output_path, use_adaptive=use_adaptive
         )
         if result['success']:
             self.stego_audio_path = result['output_path']
@@ -296,7 +302,8 @@ class SteganographyApp:
             n_lsb = int(self.lsb_var.get())
             use_encryption = bool(self.encrypt_var.get())
             use_random_start = bool(self.random_start_var.get())
-            self._execute_embed(audio_file, stego_key, n_lsb, use_encryption, use_random_start)
+            use_adaptive = bool(self.adaptive_var.get())
+            self._execute_embed(audio_file, stego_key, n_lsb, use_encryption, use_random_start, use_adaptive)
         elif mode == 'extract':
             self._execute_extract(audio_file, stego_key)
 
@@ -315,7 +322,7 @@ class SteganographyApp:
                     f"Original Filename: {metadata.get('filename', 'N/A')}\n"
                     f"File Size: {metadata.get('filesize', 'N/A')} bytes\n\n"
                     f"--- Embedding Parameters ---\n"
-                    f"n-LSB Used: {metadata.get('n_lsb', 'N/A')}-bit\n"
+                    f"n-LSB Used: {metadata.get('n_lsb', 'N/A')}-bit{' (adaptive)' if metadata.get('adaptive') else ''}\n"
                     f"Encryption: {'Enabled' if metadata.get('encrypted') else 'Disabled'}\n"
                     f"Start Point: {'Random' if metadata.get('random_start') else 'Sequential'}\n"
                     f"Payload Position: byte {result.get('starting_position', 'N/A')}\n\n"
@@ -1,5 +1,6 @@
 import formula as f
 import processing as proc
+import scanner
 
 def main():
     print("=== Multiple-LSB Audio Steganography ===")
@@ -7,8 +8,9 @@ def main():
     print("2. Extract message")
     print("3. Check audio capacity")
     print("4. Test encryption/decryption")
+    print("5. Scan directory for stego files")
     
-    choice = input("\nPilih operasi (1-4): ")
+    choice = input("\nPilih operasi (1-5): ")
     
     if choice == "1":
         # Embed message
@@ -18,6 +20,7 @@ def main():
         n_lsb = int(input("n-LSB (1-4): "))
         use_encryption = input("Gunakan enkripsi? (y/n): ").lower() == 'y'
         use_random = input("Gunakan random start? (y/n): ").lower() == 'y'
+        use_adaptive = input("Gunakan adaptive n-LSB? (y/n): ").lower() == 'y'
         output_path = input("Output path (default: output_stego.wav): ") or "output_stego.wav"
         
         result = proc.embed_message(
@@ -27,7 +30,8 @@ def main():
             n_lsb=n_lsb,
             use_encryption=use_encryption,
             use_random_start=use_random,
-            output_path=output_path
+            output_path=output_path,
+            use_adaptive=use_adaptive
         )
         
         if result['success']:
@@ -92,6 +96,29 @@ def main():
         print(f"Encrypted: {encrypted}")
         print(f"Decrypted: {decrypted}")
         print(f"Match: {plaintext == decrypted}")
+    
+    elif choice == "5":
+        # Scan directory
+        root_dir = input("Direktori yang akan dipindai: ")
+        index_path = input(f"Path index (default: <direktori>/{scanner.SCAN_INDEX_FILENAME}): ") or None
+        
+        result = scanner.scan_directory(root_dir, index_path=index_path)
+        
+        if result['success']:
+            print(f"\n✓ Pemindaian selesai ({result['scanned']} dipindai, {result['skipped']} dilewati)")
+            print(f"Index: {result['index_path']}")
+            if result['warning']:
+                print(f"⚠ {result['warning']}")
+            for hit in result['hits']:
+                metadata = hit['metadata']
+                print(f"- {hit['path']}: {metadata['filename']} ({metadata['filesize']} bytes, "
+                      f"{metadata['n_lsb']}-LSB, enkripsi={metadata.get('encrypted', False)}, "
+                      f"random={metadata.get('random_start', False)}, posisi={hit['starting_position']})")
+            for error in result['errors']:
+                print(f"! {error['path']}: {error['error']}")
+            print(f"Total file stego: {len(result['hits'])}")
+        else:
+            print(f"\n✗ Gagal: {result['error']}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
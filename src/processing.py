@@ -1,10 +1,15 @@
 from pydub import AudioSegment
+import numpy as np
 import random
 import json
+import base64
 from formula import extended_vigenere_encrypt, extended_vigenere_decrypt, convert_key_to_seed, calculate_audio_psnr
 
 POINTER_LENGTH_BYTES = 8
 METADATA_HEADER_LENGTH = 4 
+MAX_METADATA_LENGTH = 1024
+ADAPTIVE_MAX_BLOCKS = 512
+SAMPLE_DTYPES = {1: np.uint8, 2: '<i2', 4: '<i4'}
 
 def _embed_bits(raw_data, bits_to_embed, start_byte_index, n_lsb):
     bit_index = 0
@@ -72,8 +77,222 @@ def _bytes_to_bits(byte_data):
             bits.append((byte >> (7 - i)) & 1)
     return bits
 
+def _read_header(read_window, total_len, n_lsb):
+    pointer_audio_bytes = (POINTER_LENGTH_BYTES * 8 + n_lsb - 1) // n_lsb
+    pointer_bits = _extract_bits(read_window(0, pointer_audio_bytes), POINTER_LENGTH_BYTES * 8, 0, n_lsb)
+    starting_pos = int.from_bytes(_bits_to_bytes(pointer_bits), 'big')
+    if starting_pos < pointer_audio_bytes or starting_pos >= total_len:
+        return None
+
+    header_audio_bytes = (METADATA_HEADER_LENGTH * 8 + n_lsb - 1) // n_lsb
+    metadata_header_bits = _extract_bits(read_window(starting_pos, header_audio_bytes), METADATA_HEADER_LENGTH * 8, 0, n_lsb)
+    metadata_len = int.from_bytes(_bits_to_bytes(metadata_header_bits), 'big')
+    if metadata_len > MAX_METADATA_LENGTH:
+        return None
+
+    metadata_audio_bytes = (metadata_len * 8 + n_lsb - 1) // n_lsb
+    metadata_bits = _extract_bits(read_window(starting_pos + header_audio_bytes, metadata_audio_bytes), metadata_len * 8, 0, n_lsb)
+    metadata = json.loads(_bits_to_bytes(metadata_bits).decode('utf-8'))
+    if not isinstance(metadata, dict):
+        return None
+    return starting_pos, metadata_len, metadata
+
+def _block_energy(raw_data, sample_width, channels):
+    frame_size = sample_width * channels
+    block_size = max(frame_size, (len(raw_data) + ADAPTIVE_MAX_BLOCKS - 1) // ADAPTIVE_MAX_BLOCKS)
+    block_size = (block_size + frame_size - 1) // frame_size * frame_size
+    num_blocks = (len(raw_data) + block_size - 1) // block_size
+
+    usable_len = len(raw_data) // sample_width * sample_width
+    if sample_width == 3:
+        # PCM 24-bit little-endian tidak punya dtype NumPy, rakit manual lalu sign-extend.
+        triplets = np.frombuffer(raw_data[:usable_len], dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        samples = triplets[:, 0] | (triplets[:, 1] << 8) | (triplets[:, 2] << 16)
+        samples = np.where(samples >= 1 << 23, samples - (1 << 24), samples)
+    elif sample_width in SAMPLE_DTYPES:
+        samples = np.frombuffer(raw_data[:usable_len], dtype=SAMPLE_DTYPES[sample_width]).astype(np.int64)
+        if sample_width == 1:
+            samples -= 128
+    else:
+        raise ValueError(f"Mode adaptif tidak mendukung sample width {sample_width} byte")
+
+    samples_per_block = block_size // sample_width
+    squared = np.zeros(num_blocks * samples_per_block)
+    squared[:len(samples)] = samples.astype(np.float64) ** 2
+    energy = squared.reshape(num_blocks, samples_per_block).mean(axis=1)
+    return energy, block_size
+
+def _usable_block_lens(num_blocks, block_size, total_len, data_start):
+    block_starts = np.arange(num_blocks, dtype=np.int64) * block_size
+    block_ends = np.minimum(block_starts + block_size, total_len)
+    return np.clip(block_ends - np.maximum(block_starts, data_start), 0, None)
+
+def _allocate_lsb_map(energy, block_size, total_len, n_lsb, data_start, num_bits, use_random_start):
+    # Alokasi disesuaikan dengan ukuran payload: jika muat pada n_lsb, blok paling senyap diturunkan ke
+    # n_lsb - 1; jika tidak muat, hanya blok paling keras secukupnya yang dinaikkan ke n_lsb + 1.
+    usable_lens = _usable_block_lens(len(energy), block_size, total_len, data_start)
+    lsb_map = np.full(len(energy), n_lsb, dtype=np.int64)
+    fixed_capacity = int(np.sum(usable_lens)) * n_lsb
+
+    if fixed_capacity >= num_bits:
+        if n_lsb == 1:
+            return lsb_map
+        spare = fixed_capacity - num_bits
+        if use_random_start:
+            # Sisakan separuh ruang cadangan agar posisi awal acak tetap punya rentang.
+            spare -= spare // 2
+        order = np.argsort(energy, kind='stable')
+        demoted = int(np.searchsorted(np.cumsum(usable_lens[order]), spare, side='right'))
+        lsb_map[order[:demoted]] = n_lsb - 1
+        return lsb_map
+
+    if n_lsb == 4:
+        return None
+    order = np.argsort(-energy, kind='stable')
+    promoted = int(np.searchsorted(np.cumsum(usable_lens[order]), num_bits - fixed_capacity, side='left')) + 1
+    if promoted > len(order):
+        return None
+    lsb_map[order[:promoted]] = n_lsb + 1
+    return lsb_map
+
+def _expected_cost_per_bit(n_bits):
+    # Galat kuadrat rata-rata per bit saat n_bits LSB acak diganti bit acak: (4^n - 1) / 6 per byte.
+    return (4.0 ** n_bits - 1) / (6 * n_bits)
+
+def _plan_lsb_map(raw_data, sample_width, channels, n_lsb, metadata, num_bits, use_random_start):
+    energy, block_size = _block_energy(raw_data, sample_width, channels)
+    if num_bits == 0:
+        return None, block_size
+
+    def metadata_len(extra):
+        return len(json.dumps(dict(metadata, **extra), ensure_ascii=False).encode('utf-8'))
+
+    placeholder = {"adaptive": True, "block_size": block_size, "lsb_map": _pack_lsb_map(np.full(len(energy), n_lsb))}
+    fixed_metadata_len, adaptive_metadata_len = metadata_len({}), metadata_len(placeholder)
+    pointer_audio_bytes = (POINTER_LENGTH_BYTES * 8 + n_lsb - 1) // n_lsb
+    header_audio_bytes = (METADATA_HEADER_LENGTH * 8 + n_lsb - 1) // n_lsb + (adaptive_metadata_len * 8 + n_lsb - 1) // n_lsb
+    data_start = pointer_audio_bytes + header_audio_bytes
+
+    lsb_map = _allocate_lsb_map(energy, block_size, len(raw_data), n_lsb, data_start, num_bits, use_random_start)
+    if lsb_map is None:
+        return None, block_size
+
+    fixed_payload_bits = (METADATA_HEADER_LENGTH + fixed_metadata_len) * 8 + num_bits
+    if pointer_audio_bytes + (fixed_payload_bits + n_lsb - 1) // n_lsb <= len(raw_data):
+        # Payload juga muat pada n-LSB tetap: pakai peta hanya jika perkiraan galatnya lebih kecil.
+        capacities = _usable_block_lens(len(energy), block_size, len(raw_data), data_start) * lsb_map
+        data_cost_per_bit = np.sum(capacities * _expected_cost_per_bit(lsb_map)) / np.sum(capacities)
+        header_cost = (adaptive_metadata_len - fixed_metadata_len) * 8 * _expected_cost_per_bit(n_lsb)
+        if header_cost + num_bits * data_cost_per_bit >= num_bits * _expected_cost_per_bit(n_lsb):
+            return None, block_size
+    return lsb_map, block_size
+
+def _pack_lsb_map(lsb_map):
+    values = lsb_map - 1
+    bits = np.stack([(values >> 1) & 1, values & 1], axis=1).astype(np.uint8).ravel()
+    return base64.b64encode(np.packbits(bits).tobytes()).decode('ascii')
+
+def _unpack_lsb_map(packed, num_blocks):
+    bits = np.unpackbits(np.frombuffer(base64.b64decode(packed, validate=True), dtype=np.uint8))
+    pairs = bits[:num_blocks * 2].reshape(-1, 2).astype(np.int64)
+    if len(pairs) != num_blocks:
+        raise ValueError("Peta LSB tidak lengkap")
+    return pairs[:, 0] * 2 + pairs[:, 1] + 1
+
+def _parse_lsb_map(metadata, total_len):
+    block_size = metadata.get('block_size')
+    packed = metadata.get('lsb_map')
+    if not isinstance(block_size, int) or block_size <= 0 or not isinstance(packed, str):
+        return None
+    num_blocks = (total_len + block_size - 1) // block_size
+    if num_blocks > ADAPTIVE_MAX_BLOCKS:
+        return None
+    try:
+        return _unpack_lsb_map(packed, num_blocks)
+    except ValueError:
+        return None
+
+def _adaptive_end(lsb_map, block_size, total_len, start, num_bits):
+    # Posisi byte (eksklusif) setelah num_bits disisipkan mulai dari start, atau None jika tidak muat.
+    if num_bits == 0:
+        return start
+    if start >= total_len:
+        return None
+    block_lens = np.full(len(lsb_map), block_size, dtype=np.int64)
+    block_lens[-1] = total_len - (len(lsb_map) - 1) * block_size
+    cum_caps = np.cumsum(lsb_map * block_lens)
+    start_block = start // block_size
+    cap_before_start = cum_caps[start_block] - lsb_map[start_block] * (block_lens[start_block] - (start - start_block * block_size))
+    target = cap_before_start + num_bits
+    end_block = int(np.searchsorted(cum_caps, target))
+    if end_block == len(lsb_map):
+        return None
+    cap_before_block = cum_caps[end_block] - lsb_map[end_block] * block_lens[end_block]
+    return end_block * block_size + int((target - cap_before_block + lsb_map[end_block] - 1) // lsb_map[end_block])
+
+def _adaptive_max_start(lsb_map, block_size, total_len, min_start, header_audio_bytes, num_bits):
+    def fits(start):
+        return start + header_audio_bytes <= total_len and \
+            _adaptive_end(lsb_map, block_size, total_len, start + header_audio_bytes, num_bits) is not None
+
+    if not fits(min_start):
+        return None
+    low, high = min_start, total_len - header_audio_bytes
+    while low < high:
+        mid = (low + high + 1) // 2
+        if fits(mid):
+            low = mid
+        else:
+            high = mid - 1
+    return low
+
+def _block_spans(lsb_map, block_size, start, end):
+    # (awal, akhir, n_lsb, offset bit) untuk tiap potongan blok di [start, end).
+    bit_offset = 0
+    if end <= start:
+        return
+    for block in range(start // block_size, (end - 1) // block_size + 1):
+        span_start = max(start, block * block_size)
+        span_end = min(end, (block + 1) * block_size)
+        n_bits = int(lsb_map[block])
+        yield span_start, span_end, n_bits, bit_offset
+        bit_offset += (span_end - span_start) * n_bits
+
+def _embed_bits_adaptive(raw_data, payload, start, end, lsb_map, block_size):
+    # Dikerjakan per blok (n_lsb konstan) langsung di atas buffer, memori sebanding dengan satu blok.
+    data = np.frombuffer(raw_data, dtype=np.uint8)
+    payload_array = np.frombuffer(payload, dtype=np.uint8)
+    total_bits = len(payload_array) * 8
+    for span_start, span_end, n_bits, bit_offset in _block_spans(lsb_map, block_size, start, end):
+        span_bits = (span_end - span_start) * n_bits
+        bit_end = min(bit_offset + span_bits, total_bits)
+        chunk = np.zeros(span_bits, dtype=np.uint8)
+        if bit_end > bit_offset:
+            first_byte = bit_offset // 8
+            unpacked = np.unpackbits(payload_array[first_byte:(bit_end + 7) // 8])
+            skip = bit_offset - first_byte * 8
+            chunk[:bit_end - bit_offset] = unpacked[skip:skip + bit_end - bit_offset]
+        weights = (1 << np.arange(n_bits - 1, -1, -1)).astype(np.uint8)
+        values = (chunk.reshape(-1, n_bits) * weights).sum(axis=1, dtype=np.uint8)
+        mask = np.uint8((0xFF << n_bits) & 0xFF)
+        data[span_start:span_end] = (data[span_start:span_end] & mask) | values
+    return raw_data
+
+def _extract_bytes_adaptive(raw_data, num_bytes, start, end, lsb_map, block_size):
+    data = np.frombuffer(raw_data, dtype=np.uint8)
+    extracted = bytearray()
+    pending = np.zeros(0, dtype=np.uint8)
+    for span_start, span_end, n_bits, _ in _block_spans(lsb_map, block_size, start, end):
+        shifts = np.arange(n_bits - 1, -1, -1, dtype=np.uint8)
+        bits = ((data[span_start:span_end, None] >> shifts) & 1).astype(np.uint8).ravel()
+        bits = np.concatenate([pending, bits])
+        whole = len(bits) // 8 * 8
+        extracted += np.packbits(bits[:whole]).tobytes()
+        pending = bits[whole:]
+    return extracted[:num_bytes]
+
 def embed_message(cover_audio_path: str, secret_data: bytes, secret_filename: str, stego_key: str, n_lsb: int, 
-                  use_encryption: bool, use_random_start: bool, output_path: str) -> dict:
+                  use_encryption: bool, use_random_start: bool, output_path: str, use_adaptive: bool = False) -> dict:
     try:
         audio = AudioSegment.from_file(cover_audio_path)
         original_raw_data = bytearray(audio.raw_data)
@@ -86,27 +305,46 @@ def embed_message(cover_audio_path: str, secret_data: bytes, secret_filename: st
             "encrypted": use_encryption,
             "random_start": use_random_start
         }
-        metadata_bytes = json.dumps(metadata).encode('utf-8')
-        metadata_len_bytes = len(metadata_bytes).to_bytes(METADATA_HEADER_LENGTH, 'big')
-
         file_data_to_embed = secret_data
         if use_encryption:
             file_data_to_embed = extended_vigenere_encrypt(file_data_to_embed, stego_key)
+
+        if use_adaptive:
+            lsb_map, block_size = _plan_lsb_map(original_raw_data, audio.sample_width, audio.channels, n_lsb, metadata,
+                                                len(file_data_to_embed) * 8, use_random_start)
+            # Tanpa peta yang lebih baik, n-LSB tetap dipakai (PSNR sama atau lebih baik, metadata lebih kecil).
+            use_adaptive = lsb_map is not None
+            if use_adaptive:
+                metadata.update({"adaptive": True, "block_size": block_size, "lsb_map": _pack_lsb_map(lsb_map)})
+        metadata_bytes = json.dumps(metadata, ensure_ascii=False).encode('utf-8')
+        if len(metadata_bytes) > MAX_METADATA_LENGTH:
+            return {'success': False, 'error': 'Metadata terlalu besar. Gunakan nama file yang lebih pendek.'}
+        metadata_len_bytes = len(metadata_bytes).to_bytes(METADATA_HEADER_LENGTH, 'big')
         
-        payload_bytes = metadata_len_bytes + metadata_bytes + file_data_to_embed
+        payload_bytes = metadata_len_bytes + metadata_bytes
+        if not use_adaptive:
+            payload_bytes += file_data_to_embed
         payload_bits = _bytes_to_bits(payload_bytes)
         
         pointer_bits = POINTER_LENGTH_BYTES * 8
         pointer_audio_bytes_needed = (pointer_bits + n_lsb - 1) // n_lsb
         payload_audio_bytes_needed = (len(payload_bits) + n_lsb - 1) // n_lsb
 
-        if pointer_audio_bytes_needed + payload_audio_bytes_needed > len(modified_raw_data):
+        if use_adaptive:
+            # Data file disisipkan setelah metadata dengan n-LSB per blok sesuai lsb_map.
+            header_audio_bytes = (METADATA_HEADER_LENGTH * 8 + n_lsb - 1) // n_lsb + (len(metadata_bytes) * 8 + n_lsb - 1) // n_lsb
+            max_start = _adaptive_max_start(lsb_map, block_size, len(modified_raw_data), pointer_audio_bytes_needed,
+                                            header_audio_bytes, len(file_data_to_embed) * 8)
+            if max_start is None:
+                return {'success': False, 'error': 'Data rahasia terlalu besar untuk kapasitas audio.'}
+        elif pointer_audio_bytes_needed + payload_audio_bytes_needed > len(modified_raw_data):
             return {'success': False, 'error': 'Data rahasia terlalu besar untuk kapasitas audio.'}
+        else:
+            max_start = len(modified_raw_data) - payload_audio_bytes_needed
 
         if use_random_start:
             random.seed(convert_key_to_seed(stego_key))
             min_start = pointer_audio_bytes_needed
-            max_start = len(modified_raw_data) - payload_audio_bytes_needed
             starting_pos = random.randint(min_start, max_start) if min_start < max_start else min_start
         else:
             starting_pos = pointer_audio_bytes_needed
@@ -116,13 +354,17 @@ def embed_message(cover_audio_path: str, secret_data: bytes, secret_filename: st
         
         modified_raw_data = _embed_bits(modified_raw_data, pointer_bits_to_embed, 0, n_lsb)
         modified_raw_data = _embed_bits(modified_raw_data, payload_bits, starting_pos, n_lsb)
+        if use_adaptive:
+            data_start = starting_pos + header_audio_bytes
+            data_end = _adaptive_end(lsb_map, block_size, len(modified_raw_data), data_start, len(file_data_to_embed) * 8)
+            modified_raw_data = _embed_bits_adaptive(modified_raw_data, file_data_to_embed, data_start, data_end, lsb_map, block_size)
         
         stego_audio = AudioSegment(data=bytes(modified_raw_data), sample_width=audio.sample_width, frame_rate=audio.frame_rate, channels=audio.channels)
         stego_audio.export(output_path, format="wav")
         
         psnr_value = calculate_audio_psnr(original_raw_data, modified_raw_data)
         
-        return {'success': True, 'output_path': output_path, 'data_length_bytes': len(secret_data), 'starting_position': starting_pos, 'psnr': psnr_value}
+        return {'success': True, 'output_path': output_path, 'data_length_bytes': len(secret_data), 'starting_position': starting_pos, 'psnr': psnr_value, 'adaptive': use_adaptive}
         
     except Exception as e:
         return {'success': False, 'error': str(e)}
@@ -135,33 +377,33 @@ def extract_message(stego_audio_path: str, stego_key: str) -> dict:
         extracted_info = None
         for n_lsb_trial in range(1, 5):
             try:
-                pointer_bits = _extract_bits(raw_data, POINTER_LENGTH_BYTES * 8, 0, n_lsb_trial)
-                pointer_bytes = _bits_to_bytes(pointer_bits)
-                starting_pos = int.from_bytes(pointer_bytes, 'big')
-
-                metadata_header_bits = _extract_bits(raw_data, METADATA_HEADER_LENGTH * 8, starting_pos, n_lsb_trial)
-                metadata_header_bytes = _bits_to_bytes(metadata_header_bits)
-                metadata_len = int.from_bytes(metadata_header_bytes, 'big')
-                
-                if metadata_len > 1024:
+                header = _read_header(lambda offset, length: raw_data[offset:offset + length], len(raw_data), n_lsb_trial)
+                if header is None:
                     continue
+                starting_pos, metadata_len, metadata = header
 
-                current_audio_pos = starting_pos + ((METADATA_HEADER_LENGTH * 8 + n_lsb_trial - 1) // n_lsb_trial)
-
-                metadata_bits = _extract_bits(raw_data, metadata_len * 8, current_audio_pos, n_lsb_trial)
-                metadata_bytes = _bits_to_bytes(metadata_bits)
-                metadata = json.loads(metadata_bytes.decode('utf-8'))
+                lsb_map = None
+                if metadata.get('adaptive', False):
+                    lsb_map = _parse_lsb_map(metadata, len(raw_data))
+                    if lsb_map is None:
+                        continue
 
                 if metadata.get('random_start', False):
                     random.seed(convert_key_to_seed(stego_key))
                     
-                    payload_len = METADATA_HEADER_LENGTH + metadata_len + metadata['filesize']
-                    payload_bits_len = payload_len * 8
-                    payload_audio_bytes_needed = (payload_bits_len + n_lsb_trial - 1) // n_lsb_trial
                     pointer_audio_bytes_needed = (POINTER_LENGTH_BYTES * 8 + n_lsb_trial - 1) // n_lsb_trial
-
                     min_start = pointer_audio_bytes_needed
-                    max_start = len(raw_data) - payload_audio_bytes_needed
+                    if lsb_map is not None:
+                        header_audio_bytes = (METADATA_HEADER_LENGTH * 8 + n_lsb_trial - 1) // n_lsb_trial + (metadata_len * 8 + n_lsb_trial - 1) // n_lsb_trial
+                        max_start = _adaptive_max_start(lsb_map, metadata['block_size'], len(raw_data), min_start,
+                                                        header_audio_bytes, metadata['filesize'] * 8)
+                        if max_start is None:
+                            continue
+                    else:
+                        payload_len = METADATA_HEADER_LENGTH + metadata_len + metadata['filesize']
+                        payload_bits_len = payload_len * 8
+                        payload_audio_bytes_needed = (payload_bits_len + n_lsb_trial - 1) // n_lsb_trial
+                        max_start = len(raw_data) - payload_audio_bytes_needed
                     
                     is_key_match = False
                     for _ in range(10):
@@ -173,10 +415,10 @@ def extract_message(stego_audio_path: str, stego_key: str) -> dict:
                     if not is_key_match:
                         continue
 
-                extracted_info = {'metadata': metadata, 'starting_pos': starting_pos, 'n_lsb': n_lsb_trial}
+                extracted_info = {'metadata': metadata, 'starting_pos': starting_pos, 'metadata_len': metadata_len, 'n_lsb': n_lsb_trial, 'lsb_map': lsb_map}
                 break
 
-            except (json.JSONDecodeError, UnicodeDecodeError, IndexError, ValueError):
+            except (json.JSONDecodeError, UnicodeDecodeError, IndexError, ValueError, KeyError, TypeError):
                 continue
 
         if not extracted_info:
@@ -187,15 +429,23 @@ def extract_message(stego_audio_path: str, stego_key: str) -> dict:
         n_lsb = extracted_info['n_lsb']
         use_encryption = metadata.get('encrypted', False)
         
-        metadata_len = len(json.dumps(metadata).encode('utf-8'))
+        metadata_len = extracted_info['metadata_len']
         
         current_audio_pos = starting_pos
         current_audio_pos += ((METADATA_HEADER_LENGTH * 8 + n_lsb - 1) // n_lsb)
         current_audio_pos += ((metadata_len * 8 + n_lsb - 1) // n_lsb)
         
         file_size = metadata['filesize']
-        file_data_bits = _extract_bits(raw_data, file_size * 8, current_audio_pos, n_lsb)
-        extracted_data = _bits_to_bytes(file_data_bits)
+        lsb_map = extracted_info['lsb_map']
+        if lsb_map is not None:
+            block_size = metadata['block_size']
+            data_end = _adaptive_end(lsb_map, block_size, len(raw_data), current_audio_pos, file_size * 8)
+            if data_end is None:
+                return {'success': False, 'error': 'Gagal mengekstrak data. Ukuran data melebihi kapasitas audio.'}
+            extracted_data = _extract_bytes_adaptive(raw_data, file_size, current_audio_pos, data_end, lsb_map, block_size)
+        else:
+            file_data_bits = _extract_bits(raw_data, file_size * 8, current_audio_pos, n_lsb)
+            extracted_data = _bits_to_bytes(file_data_bits)
         
         final_data = extracted_data
         if use_encryption:
@@ -0,0 +1,155 @@
+import os
+import json
+import wave
+from concurrent.futures import ProcessPoolExecutor
+from processing import _read_header, _parse_lsb_map, _adaptive_end, METADATA_HEADER_LENGTH
+
+AUDIO_EXTENSIONS = ('.wav', '.mp3')
+SCAN_INDEX_FILENAME = '.stego_scan_index.json'
+SCAN_INDEX_SAVE_INTERVAL = 100
+REQUIRED_METADATA_KEYS = ('filename', 'filesize', 'n_lsb')
+
+def _is_riff_wave(audio_path):
+    # Output stego selalu diekspor sebagai WAV, jadi file non-WAV (mis. MP3 asli) tidak perlu di-decode.
+    with open(audio_path, 'rb') as f:
+        header = f.read(12)
+    return len(header) == 12 and header[:4] == b'RIFF' and header[8:12] == b'WAVE'
+
+def _open_window_reader(audio_path):
+    # Baca hanya jendela byte yang dibutuhkan langsung dari file, tanpa decode seluruh audio.
+    wav_file = wave.open(audio_path, 'rb')
+    frame_size = wav_file.getsampwidth() * wav_file.getnchannels()
+    total_len = wav_file.getnframes() * frame_size
+
+    def read_window(offset, length):
+        if offset >= total_len or length <= 0:
+            return b''
+        first_frame = offset // frame_size
+        last_frame = (min(offset + length, total_len) + frame_size - 1) // frame_size
+        wav_file.setpos(first_frame)
+        chunk = wav_file.readframes(last_frame - first_frame)
+        skip = offset - first_frame * frame_size
+        return chunk[skip:skip + length]
+
+    return read_window, total_len, wav_file.close
+
+def _is_valid_metadata(metadata, n_lsb, starting_pos, metadata_len, total_len):
+    if any(key not in metadata for key in REQUIRED_METADATA_KEYS):
+        return False
+    if metadata['n_lsb'] != n_lsb or not isinstance(metadata['filesize'], int) or metadata['filesize'] < 0:
+        return False
+    if metadata.get('adaptive', False):
+        lsb_map = _parse_lsb_map(metadata, total_len)
+        if lsb_map is None:
+            return False
+        data_start = starting_pos + (METADATA_HEADER_LENGTH * 8 + n_lsb - 1) // n_lsb + (metadata_len * 8 + n_lsb - 1) // n_lsb
+        return data_start <= total_len and \
+            _adaptive_end(lsb_map, metadata['block_size'], total_len, data_start, metadata['filesize'] * 8) is not None
+    payload_bits = (METADATA_HEADER_LENGTH + metadata_len + metadata['filesize']) * 8
+    return starting_pos + (payload_bits + n_lsb - 1) // n_lsb <= total_len
+
+def scan_file(audio_path: str) -> dict:
+    try:
+        if not _is_riff_wave(audio_path):
+            return {'success': True, 'path': audio_path, 'found': False, 'note': 'Bukan file WAV.'}
+        read_window, total_len, close = _open_window_reader(audio_path)
+        try:
+            for n_lsb_trial in range(1, 5):
+                try:
+                    header = _read_header(read_window, total_len, n_lsb_trial)
+                except (json.JSONDecodeError, UnicodeDecodeError, IndexError, ValueError, wave.Error):
+                    continue
+                if header is None:
+                    continue
+                starting_pos, metadata_len, metadata = header
+                if _is_valid_metadata(metadata, n_lsb_trial, starting_pos, metadata_len, total_len):
+                    return {'success': True, 'path': audio_path, 'found': True, 'metadata': metadata, 'starting_position': starting_pos}
+        finally:
+            close()
+        return {'success': True, 'path': audio_path, 'found': False}
+
+    except Exception as e:
+        return {'success': False, 'path': audio_path, 'error': str(e)}
+
+def _find_audio_files(root_dir):
+    audio_paths = []
+    for dirpath, _, filenames in os.walk(root_dir):
+        for filename in filenames:
+            if filename.lower().endswith(AUDIO_EXTENSIONS):
+                audio_paths.append(os.path.join(dirpath, filename))
+    return sorted(audio_paths)
+
+def _load_index(index_path):
+    try:
+        with open(index_path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        return index if isinstance(index, dict) else {}
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+def _save_index(index_path, index):
+    tmp_path = index_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, indent=2)
+    os.replace(tmp_path, index_path)
+
+def scan_directory(root_dir: str, index_path: str = None, max_workers: int = None) -> dict:
+    try:
+        if not os.path.isdir(root_dir):
+            return {'success': False, 'error': 'Direktori tidak ditemukan.'}
+        if index_path is None:
+            index_path = os.path.join(root_dir, SCAN_INDEX_FILENAME)
+
+        old_index = _load_index(index_path)
+        new_index = {}
+        to_scan = []
+        skipped = 0
+        for audio_path in _find_audio_files(root_dir):
+            key = os.path.relpath(audio_path, root_dir)
+            try:
+                stat = os.stat(audio_path)
+            except OSError as e:
+                # Symlink rusak atau file terhapus saat pemindaian: catat sebagai error, lanjutkan file lain.
+                new_index[key] = {'size': None, 'mtime': None, 'result': {'success': False, 'error': str(e)}}
+                continue
+            entry = old_index.get(key)
+            # File yang ukuran dan mtime-nya tidak berubah tidak perlu dipindai ulang.
+            if entry and entry.get('size') == stat.st_size and entry.get('mtime') == stat.st_mtime and entry.get('result', {}).get('success'):
+                new_index[key] = entry
+                skipped += 1
+            else:
+                to_scan.append((key, audio_path, stat))
+
+        warning = None
+
+        def save_index():
+            nonlocal warning
+            if warning is not None:
+                return
+            try:
+                _save_index(index_path, new_index)
+            except OSError as e:
+                # Arsip read-only: hasil pemindaian tetap dikembalikan, hanya index yang tidak tersimpan.
+                warning = f'Index tidak dapat disimpan: {e}'
+
+        if to_scan:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                results = executor.map(scan_file, [audio_path for _, audio_path, _ in to_scan], chunksize=8)
+                for done, ((key, _, stat), result) in enumerate(zip(to_scan, results), start=1):
+                    result.pop('path', None)
+                    new_index[key] = {'size': stat.st_size, 'mtime': stat.st_mtime, 'result': result}
+                    # Simpan berkala agar pemindaian yang terputus tidak kehilangan progres.
+                    if done % SCAN_INDEX_SAVE_INTERVAL == 0:
+                        save_index()
+
+        save_index()
+
+        hits = [{'path': os.path.join(root_dir, key), 'metadata': entry['result']['metadata'], 'starting_position': entry['result']['starting_position']}
+                for key, entry in sorted(new_index.items()) if entry['result'].get('found')]
+        errors = [{'path': os.path.join(root_dir, key), 'error': entry['result']['error']}
+                  for key, entry in sorted(new_index.items()) if not entry['result'].get('success')]
+
+        return {'success': True, 'hits': hits, 'errors': errors, 'scanned': len(to_scan), 'skipped': skipped, 'index_path': index_path, 'warning': warning}
+
+    except Exception as e:
+        return {'success': False, 'error': f'Terjadi kesalahan saat pemindaian: {e}'}
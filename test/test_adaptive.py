@@ -0,0 +1,144 @@
+import json
+import os
+import wave
+import tracemalloc
+
+import numpy as np
+import pytest
+
+import processing as proc
+
+
+def _write_wav(path, samples, channels=2, sample_width=2):
+    with wave.open(str(path), 'wb') as wav_file:
+        wav_file.setnchannels(channels)
+        wav_file.setsampwidth(sample_width)
+        wav_file.setframerate(44100)
+        wav_file.writeframes(samples.tobytes())
+
+
+@pytest.fixture
+def music_wav(tmp_path):
+    # 10 detik stereo 16-bit: bagian keras dan senyap bergantian.
+    t = np.arange(44100 * 10) / 44100
+    envelope = np.where((t // 1) % 2 == 0, 0.8, 0.01)
+    signal = (np.sin(2 * np.pi * 440 * t) * envelope * 32000).astype('<i2')
+    path = tmp_path / 'music.wav'
+    _write_wav(path, np.repeat(signal, 2))
+    return path
+
+
+@pytest.mark.parametrize('total_len, block_size', [(4096, 64), (4100, 64), (1000, 7), (64, 64)])
+def test_map_pack_roundtrip(total_len, block_size):
+    rng = np.random.default_rng(total_len)
+    num_blocks = (total_len + block_size - 1) // block_size
+    lsb_map = rng.integers(1, 5, size=num_blocks)
+    assert np.array_equal(proc._unpack_lsb_map(proc._pack_lsb_map(lsb_map), num_blocks), lsb_map)
+    with pytest.raises(ValueError):
+        proc._unpack_lsb_map(proc._pack_lsb_map(lsb_map[:num_blocks // 2]), num_blocks + 8)
+
+
+@pytest.mark.parametrize('total_len, block_size', [(4096, 64), (4100, 64), (1000, 7), (64, 64)])
+def test_embed_extract_roundtrip_at_block_boundaries(total_len, block_size):
+    rng = np.random.default_rng(block_size)
+    num_blocks = (total_len + block_size - 1) // block_size
+    lsb_map = rng.integers(1, 5, size=num_blocks)
+    cover = bytearray(rng.integers(0, 256, size=total_len, dtype=np.uint8).tobytes())
+
+    starts = [0, block_size - 1, block_size, (num_blocks - 1) * block_size, total_len - 1]
+    for start in starts + [int(s) for s in rng.integers(0, total_len, size=4)]:
+        capacity_bits = int(lsb_map[np.arange(start, total_len) // block_size].sum())
+        max_bytes = capacity_bits // 8
+        for num_bytes in sorted({0, min(1, max_bytes), min(37, max_bytes), max_bytes}):
+            payload = rng.integers(0, 256, size=num_bytes, dtype=np.uint8).tobytes()
+            end = proc._adaptive_end(lsb_map, block_size, total_len, start, num_bytes * 8)
+            assert end is not None and end <= total_len
+
+            stego = proc._embed_bits_adaptive(cover[:], payload, start, end, lsb_map, block_size)
+            assert bytes(proc._extract_bytes_adaptive(stego, num_bytes, start, end, lsb_map, block_size)) == payload
+            assert stego[:start] == cover[:start] and stego[end:] == cover[end:]
+        assert proc._adaptive_end(lsb_map, block_size, total_len, start, capacity_bits + 1) is None
+
+
+def test_max_start_is_tight_and_in_bounds():
+    rng = np.random.default_rng(1)
+    total_len, block_size, header_audio_bytes = 4100, 64, 20
+    lsb_map = rng.integers(1, 5, size=(total_len + block_size - 1) // block_size)
+    for num_bits in (0, 8, 800, 8000):
+        max_start = proc._adaptive_max_start(lsb_map, block_size, total_len, 32, header_audio_bytes, num_bits)
+        assert max_start + header_audio_bytes <= total_len
+        assert proc._adaptive_end(lsb_map, block_size, total_len, max_start + header_audio_bytes, num_bits) is not None
+        assert max_start + 1 + header_audio_bytes > total_len or \
+            proc._adaptive_end(lsb_map, block_size, total_len, max_start + 1 + header_audio_bytes, num_bits) is None
+
+
+@pytest.mark.parametrize('n_lsb', [1, 2, 4])
+@pytest.mark.parametrize('use_random_start', [False, True])
+def test_adaptive_psnr_not_worse_at_equal_payload(music_wav, tmp_path, n_lsb, use_random_start):
+    secret = os.urandom(2000 * n_lsb * 20)
+    results = {}
+    for use_adaptive in (False, True):
+        output = tmp_path / f'stego_{use_adaptive}.wav'
+        results[use_adaptive] = proc.embed_message(str(music_wav), secret, 'x.bin', 'key', n_lsb, False,
+                                                   use_random_start, str(output), use_adaptive=use_adaptive)
+        assert results[use_adaptive]['success']
+        assert proc.extract_message(str(output), 'key')['data'] == secret
+    assert results[True]['psnr'] >= results[False]['psnr']
+
+
+@pytest.mark.parametrize('n_lsb', [1, 2])
+def test_adaptive_fits_secret_larger_than_fixed_capacity(music_wav, tmp_path, n_lsb):
+    with wave.open(str(music_wav)) as wav_file:
+        raw_len = wav_file.getnframes() * wav_file.getsampwidth() * wav_file.getnchannels()
+    secret = os.urandom(raw_len * n_lsb // 8 + 20000)
+    output = tmp_path / 'stego.wav'
+
+    assert not proc.embed_message(str(music_wav), secret, 'x.bin', 'key', n_lsb, True, True, str(output))['success']
+    result = proc.embed_message(str(music_wav), secret, 'x.bin', 'key', n_lsb, True, True, str(output), use_adaptive=True)
+    assert result['success'] and result['adaptive']
+    assert proc.extract_message(str(output), 'key')['data'] == secret
+    assert not proc.extract_message(str(output), 'wrong key')['success']
+
+
+def test_long_filename_roundtrips_or_is_rejected(music_wav, tmp_path):
+    secret = os.urandom(300000)
+    output = tmp_path / 'stego.wav'
+    result = proc.embed_message(str(music_wav), secret, 'é' * 120 + '.txt', 'key', 2, False, True, str(output), use_adaptive=True)
+    assert result['success'] and result['adaptive']
+    assert proc.extract_message(str(output), 'key')['data'] == secret
+
+    result = proc.embed_message(str(music_wav), secret, 'é' * 600 + '.txt', 'key', 2, False, True, str(output), use_adaptive=True)
+    assert not result['success']
+
+
+def test_energy_profile_24_bit():
+    samples = np.array([0, 1 << 22, -(1 << 22), -1], dtype=np.int32)
+    raw = bytearray(np.stack([samples & 0xFF, (samples >> 8) & 0xFF, (samples >> 16) & 0xFF], axis=1).astype(np.uint8).tobytes())
+    energy, block_size = proc._block_energy(raw, 3, 1)
+    assert block_size == 3
+    assert np.array_equal(energy, samples.astype(np.float64) ** 2)
+
+
+def test_invalid_adaptive_metadata_is_rejected():
+    total_len = 1000
+    valid = {'block_size': 10, 'lsb_map': proc._pack_lsb_map(np.full(100, 2))}
+    assert proc._parse_lsb_map(valid, total_len) is not None
+    for metadata in ({}, dict(valid, block_size=0), dict(valid, block_size='10'), dict(valid, lsb_map='!!'),
+                     dict(valid, lsb_map='AAAA'), dict(valid, block_size=1)):
+        assert proc._parse_lsb_map(metadata, total_len) is None
+
+
+def test_embed_memory_scales_with_audio_not_payload():
+    rng = np.random.default_rng(0)
+    total_len, block_size = 8_000_000, 8_000_000 // proc.ADAPTIVE_MAX_BLOCKS
+    lsb_map = rng.integers(1, 5, size=proc.ADAPTIVE_MAX_BLOCKS)
+    cover = bytearray(total_len)
+    payload = os.urandom(1_000_000)
+    end = proc._adaptive_end(lsb_map, block_size, total_len, 0, len(payload) * 8)
+
+    tracemalloc.start()
+    proc._embed_bits_adaptive(cover, payload, 0, end, lsb_map, block_size)
+    proc._extract_bytes_adaptive(cover, len(payload), 0, end, lsb_map, block_size)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert peak < 4 * len(payload)
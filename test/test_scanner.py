@@ -0,0 +1,118 @@
+import json
+import os
+import wave
+
+import numpy as np
+import pytest
+
+import processing as proc
+import scanner
+
+
+def _write_wav(path, seed, seconds=2):
+    rng = np.random.default_rng(seed)
+    t = np.arange(44100 * seconds) / 44100
+    envelope = np.where((t * 4 // 1) % 2 == 0, 0.8, 0.01)
+    signal = (np.sin(2 * np.pi * 440 * t) * envelope * 32000 + rng.normal(0, 50, len(t))).astype('<i2')
+    with wave.open(str(path), 'wb') as wav_file:
+        wav_file.setnchannels(2)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(44100)
+        wav_file.writeframes(np.repeat(signal, 2).tobytes())
+
+
+@pytest.fixture
+def archive(tmp_path):
+    root = tmp_path / 'archive'
+    (root / 'sub').mkdir(parents=True)
+    cover = tmp_path / 'cover.wav'
+    _write_wav(cover, 0)
+    _write_wav(root / 'clean.wav', 1)
+    for name, n_lsb, use_random_start, use_adaptive in (('fixed.wav', 2, False, False), ('sub/random.wav', 1, True, False),
+                                                          ('sub/adaptive.wav', 2, True, True)):
+        result = proc.embed_message(str(cover), os.urandom(20000), 'secret.bin', 'key', n_lsb, True,
+                                    use_random_start, str(root / name), use_adaptive=use_adaptive)
+        assert result['success'] and result.get('adaptive', False) == use_adaptive
+    (root / 'song.mp3').write_bytes(b'ID3' + os.urandom(4000))
+    (root / 'broken.wav').write_bytes(b'RIFF\x00\x10\x00\x00WAVEfmt ')
+    return root
+
+
+def _hit_paths(result, root):
+    return sorted(os.path.relpath(hit['path'], root) for hit in result['hits'])
+
+
+def test_scan_file_detects_payloads(archive):
+    for name in ('fixed.wav', 'sub/random.wav', 'sub/adaptive.wav'):
+        result = scanner.scan_file(str(archive / name))
+        assert result['found'] and result['metadata']['filename'] == 'secret.bin'
+    assert scanner.scan_file(str(archive / 'clean.wav')) == {'success': True, 'path': str(archive / 'clean.wav'), 'found': False}
+
+
+def test_non_wav_is_skipped_without_decoding(archive):
+    result = scanner.scan_file(str(archive / 'song.mp3'))
+    assert result['success'] and not result['found'] and 'note' in result
+
+
+def test_broken_wav_is_reported_as_error(archive):
+    result = scanner.scan_file(str(archive / 'broken.wav'))
+    assert not result['success'] and result['error']
+
+
+def test_invalid_adaptive_header_is_not_a_hit():
+    metadata = {'filename': 'a', 'filesize': 10, 'n_lsb': 2, 'adaptive': True, 'block_size': 8, 'lsb_map': 'AAAA'}
+    assert not scanner._is_valid_metadata(metadata, 2, 100, 50, 4096)
+    metadata['lsb_map'] = proc._pack_lsb_map(np.full(512, 2))
+    assert scanner._is_valid_metadata(metadata, 2, 100, 50, 4096)
+    metadata['filesize'] = 4096
+    assert not scanner._is_valid_metadata(metadata, 2, 100, 50, 4096)
+
+
+def test_scan_directory_and_incremental_rescan(archive, tmp_path):
+    index_path = tmp_path / 'index.json'
+    result = scanner.scan_directory(str(archive), index_path=str(index_path), max_workers=2)
+    assert result['success'] and result['warning'] is None
+    assert _hit_paths(result, archive) == ['fixed.wav', 'sub/adaptive.wav', 'sub/random.wav']
+    assert [os.path.relpath(error['path'], archive) for error in result['errors']] == ['broken.wav']
+    assert (result['scanned'], result['skipped']) == (6, 0)
+    assert not (archive / scanner.SCAN_INDEX_FILENAME).exists()
+
+    result = scanner.scan_directory(str(archive), index_path=str(index_path), max_workers=2)
+    # Hanya file yang gagal dibaca yang dipindai ulang.
+    assert (result['scanned'], result['skipped']) == (1, 5)
+    assert _hit_paths(result, archive) == ['fixed.wav', 'sub/adaptive.wav', 'sub/random.wav']
+
+    _write_wav(archive / 'fixed.wav', 2, seconds=3)
+    result = scanner.scan_directory(str(archive), index_path=str(index_path), max_workers=2)
+    assert (result['scanned'], result['skipped']) == (2, 4)
+    assert _hit_paths(result, archive) == ['sub/adaptive.wav', 'sub/random.wav']
+
+
+def test_dangling_symlink_does_not_abort_scan(archive):
+    os.symlink('/nonexistent.wav', archive / 'dangling.wav')
+    result = scanner.scan_directory(str(archive), max_workers=2)
+    assert result['success']
+    assert len(result['hits']) == 3
+    assert 'dangling.wav' in [os.path.relpath(error['path'], archive) for error in result['errors']]
+
+
+def test_unwritable_index_keeps_hits(archive, tmp_path):
+    result = scanner.scan_directory(str(archive), index_path=str(tmp_path / 'missing' / 'index.json'), max_workers=2)
+    assert result['success'] and result['warning']
+    assert len(result['hits']) == 3
+
+
+def test_index_is_saved_incrementally(archive, tmp_path, monkeypatch):
+    index_path = tmp_path / 'index.json'
+    saved_sizes = []
+    save_index = scanner._save_index
+
+    def recording_save(path, index):
+        saved_sizes.append(len(index))
+        save_index(path, index)
+
+    monkeypatch.setattr(scanner, 'SCAN_INDEX_SAVE_INTERVAL', 2)
+    monkeypatch.setattr(scanner, '_save_index', recording_save)
+    scanner.scan_directory(str(archive), index_path=str(index_path), max_workers=2)
+    assert saved_sizes == [2, 4, 6, 6]
+    assert len(json.loads(index_path.read_text())) == 6